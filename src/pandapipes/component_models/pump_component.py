@@ -93,31 +93,39 @@ class Pump(BranchWZeroLengthComponent):
         pump_branch_pit = branch_pit[f:t, :]
         area = pump_branch_pit[:, AREA]
 
-        pump_array = get_component_array(net, cls.table_name())
-        idx = pump_array[:, cls.STD_TYPE].astype(np.int32)
-        std_types = get_std_type_lookup(net, cls.table_name())[idx]
+        # the assigned std types do not change during a pipeflow, so the characteristic functions
+        # are resolved once per solve and cached in the internal data between Newton iterations
+        internal_data = net.get("_internal_data")
+        fcts = None if internal_data is None else internal_data.get("pump_std_type_fcts")
+        if fcts is None:
+            pump_array = get_component_array(net, cls.table_name())
+            idx = pump_array[:, cls.STD_TYPE].astype(np.int32)
+            std_types = get_std_type_lookup(net, cls.table_name())[idx]
+            if not len(std_types):
+                return
+            fcts = itemgetter(*std_types)(net['std_types']['pump'])
+            fcts = [fcts] if not isinstance(fcts, tuple) else fcts
+            if internal_data is not None:
+                internal_data["pump_std_type_fcts"] = fcts
 
         from_nodes = pump_branch_pit[:, FROM_NODE].astype(np.int32)
         # to_nodes = pump_branch_pit[:, TO_NODE].astype(np.int32)
         fluid = get_fluid(net)
-        p_from = node_pit[from_nodes, PAMB] + node_pit[from_nodes, PINIT]
-        # p_to = node_pit[to_nodes, PAMB] + node_pit[to_nodes, PINIT]
-        t_from = node_pit[from_nodes, TINIT_NODE]
-        numerator_from = NORMAL_PRESSURE * t_from
-        v_mps = pump_branch_pit[:, MDOTINIT] / pump_branch_pit[:, AREA] / fluid.get_density(NORMAL_TEMPERATURE)
+        v_mps = pump_branch_pit[:, MDOTINIT] / area / fluid.get_density(NORMAL_TEMPERATURE)
         if fluid.is_gas:
             # consider volume flow at inlet
+            p_from = node_pit[from_nodes, PAMB] + node_pit[from_nodes, PINIT]
+            # p_to = node_pit[to_nodes, PAMB] + node_pit[to_nodes, PINIT]
+            t_from = node_pit[from_nodes, TINIT_NODE]
+            numerator_from = NORMAL_PRESSURE * t_from
             normfactor_from = numerator_from * fluid.get_property("compressibility", p_from) \
                               / (p_from * NORMAL_TEMPERATURE)
             v_from = v_mps * normfactor_from
         else:
             v_from = v_mps
         vol = v_from * area
-        if len(std_types):
-            fcts = itemgetter(*std_types)(net['std_types']['pump'])
-            fcts = [fcts] if not isinstance(fcts, tuple) else fcts
-            pl = np.array(list(map(lambda x, y: x.get_pressure(y), fcts, vol)))
-            pump_branch_pit[:, PL] = pl
+        pl = np.array(list(map(lambda x, y: x.get_pressure(y), fcts, vol)))
+        pump_branch_pit[:, PL] = pl
 
     @classmethod
     def extract_results(cls, net, options, branch_results, mode):
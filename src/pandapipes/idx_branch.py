@@ -38,5 +38,7 @@ TEXT = 28 # temperature of surrounding [K]
 PL = 29 # Pressure lift [bar]
 TL = 30 # Temperature lift [K]
 BRANCH_TYPE = 31  # branch type relevant for the pressure controller
+L_OVER_D = 32  # Length divided by diameter (precomputed, as both are static during a pipeflow)
+LENGTH_NONZERO = 33  # 1. if the branch has a nonzero length, else 0. (weight for the Colebrook loop)
 
-branch_cols = 32
+branch_cols = 34
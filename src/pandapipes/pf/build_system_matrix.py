@@ -5,14 +5,14 @@
 import numpy as np
 from scipy.sparse import csr_matrix
 
-from pandapipes.idx_branch import FROM_NODE, TO_NODE, JAC_DERIV_DM, JAC_DERIV_DP, JAC_DERIV_DP1, \
+from pandapipes.idx_branch import JAC_DERIV_DM, JAC_DERIV_DP, JAC_DERIV_DP1, \
     JAC_DERIV_DM_NODE, LOAD_VEC_NODES, LOAD_VEC_BRANCHES, JAC_DERIV_DT, JAC_DERIV_DTOUT, \
     JAC_DERIV_DT_NODE, LOAD_VEC_NODES_T, LOAD_VEC_BRANCHES_T, BRANCH_TYPE
 from pandapipes.idx_node import LOAD, TINIT
 from pandapipes.idx_node import P, PC, NODE_TYPE, T, NODE_TYPE_T
 from pandapipes.pf.internals_toolbox import _sum_by_group_sorted, _sum_by_group, \
     get_from_nodes_corrected, get_to_nodes_corrected
-from pandapipes.pf.pipeflow_setup import get_net_option
+from pandapipes.pf.pipeflow_setup import get_net_option, get_from_to_nodes_int
 
 
 def build_system_matrix(net, branch_pit, node_pit, heat_mode):
@@ -43,8 +43,7 @@ def build_system_matrix(net, branch_pit, node_pit, heat_mode):
     pc_nodes = np.where(node_pit[:, ntyp_col] == pc_type)[0]
 
     if not heat_mode:
-        fn = branch_pit[:, FROM_NODE].astype(np.int32)
-        tn = branch_pit[:, TO_NODE].astype(np.int32)
+        fn, tn = get_from_to_nodes_int(net, branch_pit)
     else:
         fn = get_from_nodes_corrected(branch_pit)
         tn = get_to_nodes_corrected(branch_pit)
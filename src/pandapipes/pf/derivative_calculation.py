@@ -1,16 +1,48 @@
 import numpy as np
 
 from pandapipes.constants import NORMAL_TEMPERATURE
-from pandapipes.idx_branch import LENGTH, D, K, RE, LAMBDA, LOAD_VEC_BRANCHES, \
-    JAC_DERIV_DM, JAC_DERIV_DP, JAC_DERIV_DP1, LOAD_VEC_NODES, JAC_DERIV_DM_NODE, \
-    FROM_NODE, TO_NODE, TOUTINIT, TEXT, AREA, ALPHA, TL, QEXT, LOAD_VEC_NODES_T, \
-    LOAD_VEC_BRANCHES_T, JAC_DERIV_DT, JAC_DERIV_DTOUT, JAC_DERIV_DT_NODE, MDOTINIT
+from pandapipes.idx_branch import LENGTH, D, K, RE, LAMBDA, \
+    TOUTINIT, TEXT, AREA, ALPHA, TL, QEXT, LOAD_VEC_NODES_T, \
+    LOAD_VEC_BRANCHES_T, JAC_DERIV_DT, JAC_DERIV_DTOUT, JAC_DERIV_DT_NODE, MDOTINIT, \
+    LOSS_COEFFICIENT, PL, L_OVER_D, LENGTH_NONZERO, JAC_DERIV_DM, JAC_DERIV_DP, JAC_DERIV_DP1, \
+    LOAD_VEC_BRANCHES, LOAD_VEC_NODES, JAC_DERIV_DM_NODE
 from pandapipes.idx_node import TINIT as TINIT_NODE
 from pandapipes.pf.internals_toolbox import get_from_nodes_corrected
+from pandapipes.pf.pipeflow_setup import get_from_to_nodes_int
 from pandapipes.properties.fluids import get_fluid
 from pandapipes.properties.properties_toolbox import get_branch_real_density, get_branch_real_eta, \
     get_branch_cp
 
+# resolved derivative toolboxes (numpy / numba) by use_numba flag, c.f. get_kernels
+_KERNELS = {}
+
+
+def get_kernels(use_numba):
+    """
+    Return the derivative kernels of the numpy or the numba toolbox as a dict by their canonical
+    name (without the _np / _numba suffix). The toolbox import and the name resolution only run
+    once per toolbox instead of in every Newton iteration.
+
+    :param use_numba: Whether the numba toolbox should be used
+    :type use_numba: bool
+    :return: The kernels of the requested toolbox
+    :rtype: dict
+    """
+    key = bool(use_numba)
+    if key not in _KERNELS:
+        if key:
+            from pandapipes.pf import derivative_toolbox_numba as toolbox
+            suffix = "_numba"
+        else:
+            from pandapipes.pf import derivative_toolbox as toolbox
+            suffix = "_np"
+        names = ("derivatives_hydraulic_incomp", "derivatives_hydraulic_comp",
+                 "derivatives_thermal", "calc_medium_pressure_with_derivative",
+                 "calc_lambda_nikuradse_incomp", "calc_lambda_nikuradse_comp", "colebrook",
+                 "calc_derived_values")
+        _KERNELS[key] = {name: getattr(toolbox, name + suffix) for name in names}
+    return _KERNELS[key]
+
 
 def calculate_derivatives_hydraulic(net, branch_pit, node_pit, options):
     """
@@ -29,91 +61,97 @@ def calculate_derivatives_hydraulic(net, branch_pit, node_pit, options):
     fluid = get_fluid(net)
     gas_mode = fluid.is_gas
     friction_model = options["friction_model"]
-    rho = get_branch_real_density(fluid, node_pit, branch_pit)
-    eta = get_branch_real_eta(fluid, node_pit, branch_pit)
+    # gather the corrected from nodes and their temperatures once for all fluid properties
+    from_nodes_corrected = get_from_nodes_corrected(branch_pit)
+    t_from = node_pit[from_nodes_corrected, TINIT_NODE]
+    rho = get_branch_real_density(fluid, node_pit, branch_pit, from_nodes_corrected, t_from)
+    eta = get_branch_real_eta(fluid, node_pit, branch_pit, t_from)
 
     lambda_, re = calc_lambda(
         branch_pit[:, MDOTINIT], eta, branch_pit[:, D],
-        branch_pit[:, K], gas_mode, friction_model, branch_pit[:, LENGTH], options, branch_pit[:, AREA])
+        branch_pit[:, K], gas_mode, friction_model, branch_pit[:, LENGTH_NONZERO], options,
+        branch_pit[:, AREA])
     der_lambda = calc_der_lambda(branch_pit[:, MDOTINIT], eta,
                                  branch_pit[:, D], branch_pit[:, K], friction_model, lambda_, branch_pit[:, AREA])
     branch_pit[:, RE] = re
     branch_pit[:, LAMBDA] = lambda_
-    from_nodes = branch_pit[:, FROM_NODE].astype(np.int32)
-    to_nodes = branch_pit[:, TO_NODE].astype(np.int32)
-    tinit_branch, height_difference, p_init_i_abs, p_init_i1_abs = \
-        get_derived_values(node_pit, from_nodes, to_nodes, options["use_numba"])
+    from_nodes, to_nodes = get_from_to_nodes_int(net, branch_pit)
+    height_difference, p_init_i_abs, p_init_i1_abs = \
+        get_derived_values(net, node_pit, from_nodes, to_nodes, options["use_numba"])
 
+    kernels = get_kernels(options["use_numba"])
     if not gas_mode:
-        if options["use_numba"]:
-            from pandapipes.pf.derivative_toolbox_numba import derivatives_hydraulic_incomp_numba \
-                as derivatives_hydraulic_incomp
-        else:
-            from pandapipes.pf.derivative_toolbox import derivatives_hydraulic_incomp_np \
-                as derivatives_hydraulic_incomp
-
-        load_vec, load_vec_nodes, df_dm, df_dm_nodes, df_dp, df_dp1 = derivatives_hydraulic_incomp(
-            branch_pit, der_lambda, p_init_i_abs, p_init_i1_abs, height_difference, rho)
+        # the kernels work on separate 1d column views of the pit, so that each array argument
+        # can be traversed (and written) sequentially
+        kernels["derivatives_hydraulic_incomp"](
+            branch_pit[:, MDOTINIT], lambda_, branch_pit[:, LOSS_COEFFICIENT],
+            branch_pit[:, AREA], branch_pit[:, PL], branch_pit[:, L_OVER_D], der_lambda,
+            p_init_i_abs, p_init_i1_abs, height_difference, rho,
+            branch_pit[:, JAC_DERIV_DM], branch_pit[:, LOAD_VEC_BRANCHES],
+            branch_pit[:, JAC_DERIV_DP], branch_pit[:, JAC_DERIV_DP1],
+            branch_pit[:, LOAD_VEC_NODES], branch_pit[:, JAC_DERIV_DM_NODE])
     else:
-        if options["use_numba"]:
-            from pandapipes.pf.derivative_toolbox_numba import derivatives_hydraulic_comp_numba \
-                as derivatives_hydraulic_comp, calc_medium_pressure_with_derivative_numba as \
-                calc_medium_pressure_with_derivative
-        else:
-            from pandapipes.pf.derivative_toolbox import derivatives_hydraulic_comp_np \
-                as derivatives_hydraulic_comp, calc_medium_pressure_with_derivative_np as \
-                calc_medium_pressure_with_derivative
-        p_m, der_p_m, der_p_m1 = calc_medium_pressure_with_derivative(p_init_i_abs, p_init_i1_abs)
+        p_m, der_p_m, der_p_m1 = _get_reusable_buffers(net, "medium_pressure_buffers",
+                                                       len(branch_pit), 3)
+        kernels["calc_medium_pressure_with_derivative"](p_init_i_abs, p_init_i1_abs, p_m, der_p_m,
+                                                        der_p_m1)
         rho_n = np.full(len(branch_pit), fluid.get_density(NORMAL_TEMPERATURE))
         comp_fact = fluid.get_compressibility(p_m)
         # TODO: this might not be required
         der_comp = fluid.get_der_compressibility() * der_p_m
         der_comp1 = fluid.get_der_compressibility() * der_p_m1
-        load_vec, load_vec_nodes, df_dm, df_dm_nodes, df_dp, df_dp1 = derivatives_hydraulic_comp(
-            node_pit, branch_pit, lambda_, der_lambda, p_init_i_abs, p_init_i1_abs, height_difference,
-            comp_fact, der_comp, der_comp1, rho, rho_n)
-
-    branch_pit[:, LOAD_VEC_BRANCHES] = load_vec
-    branch_pit[:, JAC_DERIV_DM] = df_dm
-    branch_pit[:, JAC_DERIV_DP] = df_dp
-    branch_pit[:, JAC_DERIV_DP1] = df_dp1
-    branch_pit[:, LOAD_VEC_NODES] = load_vec_nodes
-    branch_pit[:, JAC_DERIV_DM_NODE] = df_dm_nodes
+        tm = (node_pit[from_nodes, TINIT_NODE] + branch_pit[:, TOUTINIT]) / 2
+        kernels["derivatives_hydraulic_comp"](
+            branch_pit[:, MDOTINIT], lambda_, branch_pit[:, LOSS_COEFFICIENT],
+            branch_pit[:, AREA], branch_pit[:, PL], branch_pit[:, L_OVER_D], tm, der_lambda,
+            p_init_i_abs, p_init_i1_abs, height_difference, comp_fact, der_comp, der_comp1,
+            rho, rho_n,
+            branch_pit[:, JAC_DERIV_DM], branch_pit[:, LOAD_VEC_BRANCHES],
+            branch_pit[:, JAC_DERIV_DP], branch_pit[:, JAC_DERIV_DP1],
+            branch_pit[:, LOAD_VEC_NODES], branch_pit[:, JAC_DERIV_DM_NODE])
 
 
-def calculate_derivatives_thermal(net, branch_pit, node_pit, _):
+def calculate_derivatives_thermal(net, branch_pit, node_pit, options):
     fluid = get_fluid(net)
-    cp = get_branch_cp(fluid, node_pit, branch_pit)
-    m_init = np.abs(branch_pit[:, MDOTINIT])
     from_nodes = get_from_nodes_corrected(branch_pit)
     t_init_i = node_pit[from_nodes, TINIT_NODE]
-    t_init_i1 = branch_pit[:, TOUTINIT]
-    t_amb = branch_pit[:, TEXT]
-    length = branch_pit[:, LENGTH]
-    alpha = branch_pit[:, ALPHA] * np.pi * branch_pit[:, D]
-    tl = branch_pit[:, TL]
-    qext = branch_pit[:, QEXT]
-    t_m = (t_init_i1 + t_init_i) / 2
+    cp = get_branch_cp(fluid, node_pit, branch_pit, t_init_i)
 
-    branch_pit[:, LOAD_VEC_BRANCHES_T] = \
-        -(cp * m_init * (-t_init_i + t_init_i1 - tl) - alpha * (t_amb - t_m) * length + qext)
+    # analogous to the hydraulic kernels, all five thermal slots are filled in a single pass over
+    # 1d column views of the pit
+    get_kernels(options["use_numba"])["derivatives_thermal"](
+        branch_pit[:, MDOTINIT], cp, t_init_i, branch_pit[:, TOUTINIT], branch_pit[:, TEXT],
+        branch_pit[:, LENGTH], branch_pit[:, ALPHA], branch_pit[:, D], branch_pit[:, TL],
+        branch_pit[:, QEXT],
+        branch_pit[:, LOAD_VEC_BRANCHES_T], branch_pit[:, JAC_DERIV_DT],
+        branch_pit[:, JAC_DERIV_DTOUT], branch_pit[:, JAC_DERIV_DT_NODE],
+        branch_pit[:, LOAD_VEC_NODES_T])
 
-    branch_pit[:, JAC_DERIV_DT] = - cp * m_init + alpha / 2 * length
-    branch_pit[:, JAC_DERIV_DTOUT] = cp * m_init + alpha / 2 * length
 
-    branch_pit[:, JAC_DERIV_DT_NODE] = m_init
-    branch_pit[:, LOAD_VEC_NODES_T] = m_init * t_init_i1
+def _get_reusable_buffers(net, key, n_branches, n_buffers):
+    """
+    Return a tuple of reusable float64 work buffers of branch length. The buffers are kept in
+    net["_internal_data"] between Newton iterations under the given key, so the vectorized parts
+    of the derivative calculation do not require fresh allocations on every call.
+    """
+    internal_data = net.get("_internal_data")
+    if internal_data is None:
+        return tuple(np.empty(n_branches) for _ in range(n_buffers))
+    buffers = internal_data.get(key)
+    if buffers is None or len(buffers[0]) != n_branches:
+        buffers = tuple(np.empty(n_branches) for _ in range(n_buffers))
+        internal_data[key] = buffers
+    return buffers
 
 
-def get_derived_values(node_pit, from_nodes, to_nodes, use_numba):
+def get_derived_values(net, node_pit, from_nodes, to_nodes, use_numba):
     if use_numba:
-        from pandapipes.pf.derivative_toolbox_numba import calc_derived_values_numba
-        return calc_derived_values_numba(node_pit, from_nodes, to_nodes)
-    from pandapipes.pf.derivative_toolbox import calc_derived_values_np
-    return calc_derived_values_np(node_pit, from_nodes, to_nodes)
+        return get_kernels(use_numba)["calc_derived_values"](node_pit, from_nodes, to_nodes)
+    buffers = _get_reusable_buffers(net, "derived_value_buffers", len(from_nodes), 4)
+    return get_kernels(use_numba)["calc_derived_values"](node_pit, from_nodes, to_nodes, buffers)
 
 
-def calc_lambda(m, eta, d, k, gas_mode, friction_model, lengths, options, area):
+def calc_lambda(m, eta, d, k, gas_mode, friction_model, dummy, options, area):
     """
     Function calculates the friction factor of a pipe. Turbulence is calculated based on
     Nikuradse. If v equals 0, a value of 0.001 is used in order to avoid division by zero.
@@ -133,32 +171,27 @@ def calc_lambda(m, eta, d, k, gas_mode, friction_model, lengths, options, area):
     :type gas_mode:
     :param friction_model:
     :type friction_model:
-    :param lengths:
-    :type lengths:
+    :param dummy:
+    :type dummy:
     :param options:
     :type options:
     :return:
     :rtype:
     """
-    if options["use_numba"]:
-        from pandapipes.pf.derivative_toolbox_numba import calc_lambda_nikuradse_incomp_numba as \
-            calc_lambda_nikuradse_incomp, colebrook_numba as colebrook, \
-            calc_lambda_nikuradse_comp_numba as calc_lambda_nikuradse_comp
-    else:
-        from pandapipes.pf.derivative_toolbox import calc_lambda_nikuradse_incomp_np as \
-            calc_lambda_nikuradse_incomp, colebrook_np as colebrook, \
-            calc_lambda_nikuradse_comp_np as calc_lambda_nikuradse_comp
+    kernels = get_kernels(options["use_numba"])
     if gas_mode:
-        re, lambda_laminar, lambda_nikuradse = calc_lambda_nikuradse_comp(m, d, k, eta, area)
+        re, lambda_laminar, lambda_nikuradse = kernels["calc_lambda_nikuradse_comp"](m, d, k, eta,
+                                                                                     area)
     else:
-        re, lambda_laminar, lambda_nikuradse = calc_lambda_nikuradse_incomp(m, d, k, eta, area)
+        re, lambda_laminar, lambda_nikuradse = kernels["calc_lambda_nikuradse_incomp"](m, d, k,
+                                                                                       eta, area)
 
     if friction_model == "colebrook":
         # TODO: move this import to top level if possible
         from pandapipes.pipeflow import PipeflowNotConverged
         max_iter = options.get("max_iter_colebrook", 100)
-        dummy = (lengths != 0).astype(np.float64)
-        converged, lambda_colebrook = colebrook(re, d, k, lambda_nikuradse, dummy, max_iter)
+        converged, lambda_colebrook = kernels["colebrook"](re, d, k, lambda_nikuradse, dummy,
+                                                           max_iter)
         if not converged:
             raise PipeflowNotConverged(
                 "The Colebrook-White algorithm did not converge. There might be model "
@@ -7,51 +7,51 @@ from numpy import linalg
 
 from pandapipes.constants import P_CONVERSION, GRAVITATION_CONSTANT, NORMAL_PRESSURE, \
     NORMAL_TEMPERATURE
-from pandapipes.idx_branch import LENGTH, LAMBDA, D, LOSS_COEFFICIENT as LC, PL, AREA, \
-    MDOTINIT, TOUTINIT, FROM_NODE
-from pandapipes.idx_node import HEIGHT, PINIT, PAMB, TINIT as TINIT_NODE
+from pandapipes.idx_node import HEIGHT, PINIT, PAMB
 
 
-def derivatives_hydraulic_incomp_np(branch_pit, der_lambda, p_init_i_abs, p_init_i1_abs,
-                                    height_difference, rho):
+def derivatives_hydraulic_incomp_np(m_init, lambda_, loss_coeff, area, pl, l_over_d, der_lambda,
+                                    p_init_i_abs, p_init_i1_abs, height_difference, rho,
+                                    jac_deriv_dm, load_vec_branches, jac_deriv_dp, jac_deriv_dp1,
+                                    load_vec_nodes, jac_deriv_dm_node):
     # Formulas for pressure loss in incompressible flow
     # Use medium density ((rho_from + rho_to) / 2) for Darcy Weisbach according to
     # https://www.schweizer-fn.de/rohr/rohrleitung/rohrleitung.php#fluessigkeiten
-    m_init_abs = np.abs(branch_pit[:, MDOTINIT])
-    m_init2 = m_init_abs * branch_pit[:, MDOTINIT]
+    m_init_abs = np.abs(m_init)
+    m_init2 = m_init_abs * m_init
     p_diff = p_init_i_abs - p_init_i1_abs
     const_height = rho * GRAVITATION_CONSTANT * height_difference / P_CONVERSION
-    friction_term = np.divide(branch_pit[:, LENGTH] * branch_pit[:, LAMBDA], branch_pit[:, D]) + branch_pit[:, LC]
-    const_term = np.divide(1, branch_pit[:, AREA] ** 2 * rho * P_CONVERSION * 2)
+    friction_term = l_over_d * lambda_ + loss_coeff
+    const_term = np.divide(1, area ** 2 * rho * P_CONVERSION * 2)
 
-    df_dm = - const_term * (2 * m_init_abs * friction_term + der_lambda
-                            * np.divide(branch_pit[:, LENGTH], branch_pit[:, D]) * m_init2)
+    jac_deriv_dm[:] = - const_term * (2 * m_init_abs * friction_term + der_lambda
+                            * l_over_d * m_init2)
 
-    load_vec = p_diff + branch_pit[:, PL] + const_height - const_term * m_init2 * friction_term
+    load_vec_branches[:] = \
+        p_diff + pl + const_height - const_term * m_init2 * friction_term
 
-    df_dp = np.ones_like(der_lambda)
-    df_dp1 = np.ones_like(der_lambda) * (-1)
+    jac_deriv_dp[:] = 1.
+    jac_deriv_dp1[:] = -1.
 
-    df_dm_nodes = np.ones_like(der_lambda)
-    
-    load_vec_nodes = branch_pit[:, MDOTINIT]
+    jac_deriv_dm_node[:] = 1.
 
-    return load_vec, load_vec_nodes, df_dm, df_dm_nodes, df_dp, df_dp1
+    load_vec_nodes[:] = m_init
 
 
-def derivatives_hydraulic_comp_np(node_pit, branch_pit, lambda_, der_lambda, p_init_i_abs, p_init_i1_abs,
-                                  height_difference, comp_fact, der_comp, der_comp1, rho, rho_n):
+def derivatives_hydraulic_comp_np(m_init, lambda_, loss_coeff, area, pl, l_over_d, tm,
+                                  der_lambda, p_init_i_abs, p_init_i1_abs, height_difference,
+                                  comp_fact, der_comp, der_comp1, rho, rho_n, jac_deriv_dm,
+                                  load_vec_branches, jac_deriv_dp, jac_deriv_dp1, load_vec_nodes,
+                                  jac_deriv_dm_node):
     # Formulas for gas pressure loss according to laminar version
-    m_init_abs = np.abs(branch_pit[:, MDOTINIT])
-    m_init2 = branch_pit[:, MDOTINIT] * m_init_abs
+    m_init_abs = np.abs(m_init)
+    m_init2 = m_init * m_init_abs
     p_diff = p_init_i_abs - p_init_i1_abs
     p_sum = p_init_i_abs + p_init_i1_abs
     p_sum_div = np.divide(1, p_sum)
-    from_nodes = branch_pit[:, FROM_NODE].astype(np.int32)
-    tm = (node_pit[from_nodes, TINIT_NODE] + branch_pit[:, TOUTINIT]) / 2
     const_height = rho * GRAVITATION_CONSTANT * height_difference / P_CONVERSION
-    friction_term = np.divide(lambda_ * branch_pit[:, LENGTH], branch_pit[:, D]) + branch_pit[:, LC]
-    normal_term = np.divide(NORMAL_PRESSURE, NORMAL_TEMPERATURE * P_CONVERSION * rho_n * branch_pit[:, AREA] ** 2)
+    friction_term = lambda_ * l_over_d + loss_coeff
+    normal_term = np.divide(NORMAL_PRESSURE, NORMAL_TEMPERATURE * P_CONVERSION * rho_n * area ** 2)
 
     const_term_p = normal_term * m_init2 * friction_term * tm
     df_dp = 1. - const_term_p * p_sum_div * (der_comp - comp_fact * p_sum_div)
@@ -59,14 +59,33 @@ def derivatives_hydraulic_comp_np(node_pit, branch_pit, lambda_, der_lambda, p_i
 
     const_term_m = normal_term * p_sum_div * tm * comp_fact
     df_dm = - const_term_m * (2 * m_init_abs * friction_term +
-                            np.divide(der_lambda * branch_pit[:, LENGTH] * m_init2, branch_pit[:, D]))
+                            der_lambda * l_over_d * m_init2)
 
-    load_vec = p_diff + branch_pit[:, PL] + const_height \
+    load_vec_branches[:] = p_diff + pl + const_height \
                - normal_term * comp_fact * m_init2 * friction_term * p_sum_div * tm
 
-    df_dm_nodes = np.ones_like(lambda_)
-    load_vec_nodes = branch_pit[:, MDOTINIT]
-    return load_vec, load_vec_nodes, df_dm, df_dm_nodes, df_dp, df_dp1
+    jac_deriv_dm[:] = df_dm
+    jac_deriv_dp[:] = df_dp
+    jac_deriv_dp1[:] = df_dp1
+    jac_deriv_dm_node[:] = 1.
+    load_vec_nodes[:] = m_init
+
+
+def derivatives_thermal_np(m_init, cp, t_init_i, t_init_i1, t_amb, length, alpha, d, tl, qext,
+                           load_vec_branches_t, jac_deriv_dt, jac_deriv_dtout, jac_deriv_dt_node,
+                           load_vec_nodes_t):
+    m_init_abs = np.abs(m_init)
+    alpha_d = alpha * np.pi * d
+    t_m = (t_init_i1 + t_init_i) / 2
+
+    load_vec_branches_t[:] = \
+        -(cp * m_init_abs * (-t_init_i + t_init_i1 - tl) - alpha_d * (t_amb - t_m) * length + qext)
+
+    jac_deriv_dt[:] = - cp * m_init_abs + alpha_d / 2 * length
+    jac_deriv_dtout[:] = cp * m_init_abs + alpha_d / 2 * length
+
+    jac_deriv_dt_node[:] = m_init_abs
+    load_vec_nodes_t[:] = m_init_abs * t_init_i1
 
 
 def calc_lambda_nikuradse_incomp_np(m, d, k, eta, area):
@@ -87,29 +106,16 @@ def calc_lambda_nikuradse_comp_np(m, d, k, eta, area):
     return re, lambda_laminar, lambda_nikuradse
 
 
-def calc_medium_pressure_with_derivative_np(p_init_i_abs, p_init_i1_abs):
+def calc_medium_pressure_with_derivative_np(p_init_i_abs, p_init_i1_abs, p_m, der_p_m, der_p_m1):
+    # 2/3 * (p ** 3 - p1 ** 3) / (p ** 2 - p1 ** 2) rewritten with the common factor (p - p1)
+    # cancelled --> numerically stable and exact also for p == p1 (reduces to p), so no case
+    # distinction between equal and differing pressures is required; the results are written to
+    # the output buffers handed in by the caller
     val = 2 / 3
-    p_m = p_init_i_abs.copy()
-    der_p_m = np.ones_like(p_init_i_abs)
-    der_p_m1 = np.ones_like(p_init_i_abs) * (-1)
-    p_differs = p_init_i_abs != p_init_i1_abs
-
-    if not np.any(p_differs):
-        return p_m, der_p_m, der_p_m1
-
-    p_sq = p_init_i_abs[p_differs] ** 2
-    p1_sq = p_init_i1_abs[p_differs] ** 2
-    diff_p_sq = p_sq - p1_sq
-    diff_p_sq_div = np.divide(1, diff_p_sq)
-    diff_p_cub = p_init_i_abs[p_differs] ** 3 - p_init_i1_abs[p_differs] ** 3
-    factor = diff_p_sq_div ** 2 * val
-
-    p_m[p_differs] = val * diff_p_cub * diff_p_sq_div
-    der_p_m[p_differs] = (3 * p_sq * diff_p_sq - 2 * p_init_i_abs[p_differs] * diff_p_cub) * factor
-    der_p_m1[p_differs] = (-3 * p1_sq * diff_p_sq + 2 * p_init_i1_abs[p_differs] * diff_p_cub) \
-                          * factor
-
-    return p_m, der_p_m, der_p_m1
+    p_sum_div = np.divide(1, p_init_i_abs + p_init_i1_abs)
+    p_m[:] = val * (p_init_i_abs ** 2 + p_init_i_abs * p_init_i1_abs + p_init_i1_abs ** 2) * p_sum_div
+    der_p_m[:] = val * p_init_i_abs * (p_init_i_abs + 2 * p_init_i1_abs) * p_sum_div ** 2
+    der_p_m1[:] = val * p_init_i1_abs * (p_init_i1_abs + 2 * p_init_i_abs) * p_sum_div ** 2
 
 
 def colebrook_np(re, d, k, lambda_nikuradse, dummy, max_iter):
@@ -165,9 +171,19 @@ def colebrook_np(re, d, k, lambda_nikuradse, dummy, max_iter):
     return converged, lambda_cb
 
 
-def calc_derived_values_np(node_pit, from_nodes, to_nodes):
-    tinit_branch = (node_pit[from_nodes, TINIT_NODE] + node_pit[to_nodes, TINIT_NODE]) / 2
-    height_difference = node_pit[from_nodes, HEIGHT] - node_pit[to_nodes, HEIGHT]
-    p_init_i_abs = node_pit[from_nodes, PINIT] + node_pit[from_nodes, PAMB]
-    p_init_i1_abs = node_pit[to_nodes, PINIT] + node_pit[to_nodes, PAMB]
-    return tinit_branch, height_difference, p_init_i_abs, p_init_i1_abs
+def calc_derived_values_np(node_pit, from_nodes, to_nodes, buffers=None):
+    # gather the node columns with np.take into reusable output buffers (plus one scratch
+    # buffer), so the derived values are built without any new allocation per call
+    if buffers is None:
+        buffers = tuple(np.empty(len(from_nodes)) for _ in range(4))
+    height_difference, p_init_i_abs, p_init_i1_abs, scratch = buffers
+    np.take(node_pit[:, HEIGHT], from_nodes, out=height_difference)
+    np.take(node_pit[:, HEIGHT], to_nodes, out=scratch)
+    height_difference -= scratch
+    np.take(node_pit[:, PINIT], from_nodes, out=p_init_i_abs)
+    np.take(node_pit[:, PAMB], from_nodes, out=scratch)
+    p_init_i_abs += scratch
+    np.take(node_pit[:, PINIT], to_nodes, out=p_init_i1_abs)
+    np.take(node_pit[:, PAMB], to_nodes, out=scratch)
+    p_init_i1_abs += scratch
+    return height_difference, p_init_i_abs, p_init_i1_abs
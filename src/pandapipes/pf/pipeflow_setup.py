@@ -9,8 +9,8 @@ import numpy as np
 from pandapower.auxiliary import ppException
 from scipy.sparse import coo_matrix, csgraph
 
-from pandapipes.idx_branch import FROM_NODE, TO_NODE, branch_cols, MDOTINIT, \
-    ACTIVE as ACTIVE_BR
+from pandapipes.idx_branch import FROM_NODE, TO_NODE, branch_cols, MDOTINIT, LENGTH, D, \
+    L_OVER_D, LENGTH_NONZERO, ACTIVE as ACTIVE_BR
 from pandapipes.idx_node import NODE_TYPE, P, NODE_TYPE_T, node_cols, T, ACTIVE as ACTIVE_ND, \
     TABLE_IDX as TABLE_IDX_ND, ELEMENT_IDX as ELEMENT_IDX_ND
 from pandapipes.pf.internals_toolbox import _sum_by_group
@@ -180,6 +180,28 @@ def get_lookup(net, pit_type="node", lookup_type="index"):
     return net["_lookups"]["%s_%s" % (pit_type, lookup_type)]
 
 
+def get_from_to_nodes_int(net, branch_pit):
+    """
+    Returns the FROM_NODE and TO_NODE columns of the given branch pit as int32 arrays.
+
+    If the given branch pit is the active pit, the int32 arrays cached in `reduce_pit` are
+    returned, so that the float64 pit columns do not have to be cast again in every Newton
+    iteration.
+
+    :param net: The pandapipes net to which the branch pit belongs
+    :type net: pandapipesNet
+    :param branch_pit: Internal array with branch entries
+    :type branch_pit: np.array
+    :return: (from_nodes, to_nodes) - The node indices of all branches as int32 arrays
+    :rtype: tuple(np.array)
+
+    """
+    active_pit = net.get("_active_pit")
+    if active_pit is not None and active_pit.get("branch") is branch_pit:
+        return active_pit["from_nodes"], active_pit["to_nodes"]
+    return branch_pit[:, FROM_NODE].astype(np.int32), branch_pit[:, TO_NODE].astype(np.int32)
+
+
 def set_user_pf_options(net, reset=False, **kwargs):
     """
     This function sets the "user_pf_options" dictionary for net. These options overrule
@@ -405,6 +427,13 @@ def initialize_pit(net):
                        "Without any nodes, you are not able to conduct a pipeflow!")
         return
 
+    # precompute the length / diameter ratio used by the friction term in every Newton iteration
+    # and the nonzero length flag used by the Colebrook friction model; these columns are static
+    # once the components have filled their pit entries
+    branch_pit = pit["branch"]
+    branch_pit[:, L_OVER_D] = branch_pit[:, LENGTH] / branch_pit[:, D]
+    branch_pit[:, LENGTH_NONZERO] = (branch_pit[:, LENGTH] != 0).astype(np.float64)
+
 def create_empty_pit(net):
     """
     Creates an empty internal structure which is called pit (pandapipes internal tables). The\
@@ -423,9 +452,10 @@ def create_empty_pit(net):
     """
     node_length = get_lookup(net, "node", "length")
     branch_length = get_lookup(net, "branch", "length")
-    # init empty pit
-    pit = {"node": np.empty((node_length, node_cols), dtype=np.float64),
-           "branch": np.empty((branch_length, branch_cols), dtype=np.float64),
+    # init empty pit; the arrays are allocated column-major, so that the column slices which
+    # dominate the pipeflow (e.g. branch_pit[:, MDOTINIT]) are contiguous in memory
+    pit = {"node": np.empty((node_length, node_cols), dtype=np.float64, order="F"),
+           "branch": np.empty((branch_length, branch_cols), dtype=np.float64, order="F"),
            "components": {}}
     net["_pit"] = pit
     return pit
@@ -730,7 +760,8 @@ def reduce_pit(net, mode="hydraulics"):
             get_lookup(net, "node", "index"))
         active_pit["node"] = np.copy(node_pit)
     else:
-        active_pit["node"] = np.copy(node_pit[nodes_connected, :])
+        # boolean indexing yields a row-major copy, so restore the column-major pit layout
+        active_pit["node"] = np.copy(node_pit[nodes_connected, :], order="F")
         reduced_node_lookup = np.cumsum(nodes_connected) - 1
         node_idx_lookup = get_lookup(net, "node", "index")
         net["_lookups"]["node_index_active_" + mode] = {
@@ -744,7 +775,7 @@ def reduce_pit(net, mode="hydraulics"):
         net["_lookups"]["branch_index_active_" + mode] = copy.deepcopy(
             get_lookup(net, "branch", "index"))
     else:
-        active_pit["branch"] = np.copy(branch_pit[branches_connected, :])
+        active_pit["branch"] = np.copy(branch_pit[branches_connected, :], order="F")
         branch_idx_lookup = get_lookup(net, "branch", "index")
         if len(branch_idx_lookup):
             reduced_branch_lookup = np.cumsum(branches_connected) - 1
@@ -759,6 +790,10 @@ def reduce_pit(net, mode="hydraulics"):
             branch_pit[branches_connected, FROM_NODE].astype(np.int32)]
         active_pit["branch"][:, TO_NODE] = reduced_node_lookup[
             branch_pit[branches_connected, TO_NODE].astype(np.int32)]
+    # cache the from / to nodes as int32 arrays, as the topology is fixed during the Newton
+    # iterations and the cast of the float64 pit columns would otherwise be repeated per iteration
+    active_pit["from_nodes"] = active_pit["branch"][:, FROM_NODE].astype(np.int32)
+    active_pit["to_nodes"] = active_pit["branch"][:, TO_NODE].astype(np.int32)
     net["_active_pit"] = active_pit
 
     for el, connected_els in els.items():
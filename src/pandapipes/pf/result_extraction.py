@@ -4,9 +4,8 @@ from pandapipes.constants import NORMAL_PRESSURE, NORMAL_TEMPERATURE
 from pandapipes.idx_branch import ELEMENT_IDX, FROM_NODE, TO_NODE, MDOTINIT, RE, \
     LAMBDA, PL, TOUTINIT, AREA, TEXT
 from pandapipes.idx_node import TABLE_IDX as TABLE_IDX_NODE, PINIT, PAMB, TINIT as TINIT_NODE
-from pandapipes.pf.internals_toolbox import _sum_by_group
 from pandapipes.pf.pipeflow_setup import get_table_number, get_lookup, get_net_option
-from pandapipes.properties.fluids import get_fluid
+from pandapipes.properties.fluids import get_fluid, FluidPropertyConstant
 from pandapipes.properties.properties_toolbox import get_branch_real_density
 
 try:
@@ -60,6 +59,10 @@ def get_basic_branch_results(net, branch_pit, node_pit):
     fluid = get_fluid(net)
     if fluid.is_gas:
         vf = branch_pit[:, MDOTINIT] / fluid.get_density(NORMAL_TEMPERATURE)
+    elif isinstance(fluid.all_properties["density"], FluidPropertyConstant):
+        # typical liquids carry a constant density, so the volume flow is a single scalar
+        # multiplication without any temperature gather or interpolation temporaries
+        vf = branch_pit[:, MDOTINIT] * (1. / fluid.all_properties["density"].value)
     else:
         vf = branch_pit[:, MDOTINIT] / get_branch_real_density(fluid, node_pit, branch_pit)
     v = vf / branch_pit[:, AREA]
@@ -75,11 +78,10 @@ def get_basic_branch_results(net, branch_pit, node_pit):
 def get_branch_results_gas(net, branch_pit, node_pit, from_nodes, to_nodes, v_mps, p_from, p_to):
     p_abs_from = node_pit[from_nodes, PAMB] + p_from
     p_abs_to = node_pit[to_nodes, PAMB] + p_to
-    mask = ~np.isclose(p_abs_from, p_abs_to)
-    p_abs_mean = np.empty_like(p_abs_to)
-    p_abs_mean[~mask] = p_abs_from[~mask]
-    p_abs_mean[mask] = 2 / 3 * (p_abs_from[mask] ** 3 - p_abs_to[mask] ** 3) \
-                       / (p_abs_from[mask] ** 2 - p_abs_to[mask] ** 2)
+    # 2/3 * (p ** 3 - p1 ** 3) / (p ** 2 - p1 ** 2) with the common factor (p - p1) cancelled
+    # --> numerically stable and exact also for p == p1 (reduces to p)
+    p_abs_mean = 2 / 3 * (p_abs_from ** 2 + p_abs_from * p_abs_to + p_abs_to ** 2) \
+                 / (p_abs_from + p_abs_to)
 
     fluid = get_fluid(net)
     t_from = node_pit[from_nodes, TINIT_NODE]
@@ -123,14 +125,14 @@ def get_branch_results_gas_numba(net, branch_pit, node_pit, from_nodes, to_nodes
 def get_pressures_numba(node_pit, from_nodes, to_nodes, v_mps, p_from, p_to):
     p_abs_from, p_abs_to, p_abs_mean = [np.empty_like(v_mps) for _ in range(3)]
 
+    # 2/3 * (p ** 3 - p1 ** 3) / (p ** 2 - p1 ** 2) with the common factor (p - p1) cancelled
+    # --> numerically stable and exact also for p == p1 (reduces to p)
     for i in range(len(v_mps)):
         p_abs_from[i] = node_pit[from_nodes[i], PAMB] + p_from[i]
         p_abs_to[i] = node_pit[to_nodes[i], PAMB] + p_to[i]
-        if np.less_equal(np.abs(p_abs_from[i] - p_abs_to[i]), 1e-8 + 1e-5 * abs(p_abs_to[i])):
-            p_abs_mean[i] = p_abs_from[i]
-        else:
-            p_abs_mean[i] = np.divide(2 * (p_abs_from[i] ** 3 - p_abs_to[i] ** 3),
-                                      3 * (p_abs_from[i] ** 2 - p_abs_to[i] ** 2))
+        p_abs_mean[i] = np.divide(
+            2 * (p_abs_from[i] ** 2 + p_abs_from[i] * p_abs_to[i] + p_abs_to[i] ** 2),
+            3 * (p_abs_from[i] + p_abs_to[i]))
 
     return p_abs_from, p_abs_to, p_abs_mean
 
@@ -170,10 +172,23 @@ def extract_branch_results_with_internals(net, branch_results, table_name,
     f, t = get_lookup(net, "branch", "from_to")[table_name]
 
     branch_pit = net["_pit"]["branch"]
-    # since the function _sum_by_group sorts the entries by an index (in this case the index of the
-    # respective table), the placement of the indices mus be known to allocate the values correctly
-    placement_table = np.argsort(net[table_name].index.values)
+    # since the entries are grouped by a sorted index (in this case the index of the respective
+    # table), the placement of the indices must be known to allocate the values correctly; in the
+    # usual case of an already sorted table index (e.g. a RangeIndex) the identity placement is
+    # found with one vectorized sweep instead of a full argsort
+    idx_vals = net[table_name].index.values
+    if np.all(idx_vals[:-1] <= idx_vals[1:]):
+        placement_table = np.arange(len(idx_vals))
+    else:
+        placement_table = np.argsort(idx_vals)
     idx_pit = branch_pit[f:t, ELEMENT_IDX]
+    # group the branch entries by their element index once; all sums over internal sections can
+    # then be performed with np.bincount on the inverse lookup (O(n), no repeated sorting)
+    _, group_inverse = np.unique(idx_pit, return_inverse=True)
+    n_groups = group_inverse.max() + 1 if len(group_inverse) else 0
+    # the number of internal sections per element does not depend on the calculation mode, so it
+    # is counted once for both the averaged and the last-section results
+    num_sections = np.bincount(group_inverse, minlength=n_groups)
 
     node_pit = net["_pit"]["node"]
 
@@ -190,6 +205,14 @@ def extract_branch_results_with_internals(net, branch_results, table_name,
         if result_mode == "heat" and simulation_mode in ["heat", "sequential", "bidirectional"]:
             lookup_name = "heat_transfer"
         comp_connected = get_lookup(net, "branch", "active_" + lookup_name)[f:t]
+        if len(res_mean) > 0 or len(res_branch) > 0:
+            # detect elements with connected sections once per mode; both the averaged and the
+            # last-section results are placed at the same table positions
+            connected_sum = np.bincount(group_inverse, weights=comp_connected.astype(np.float64),
+                                        minlength=n_groups)
+            connected_ind = connected_sum > 0.99
+            # hint: idx_pit[placement_table] should result in the indices as ordered in the table
+            pt = placement_table[connected_ind]
         for (res_ext, node_name) in ((res_nodes_from, "from_nodes"), (res_nodes_to, "to_nodes")):
             if len(res_ext) == 0:
                 continue
@@ -205,26 +228,14 @@ def extract_branch_results_with_internals(net, branch_results, table_name,
         if len(res_mean) > 0:
             # results that relate to the whole branch and shall be averaged (by summing up all
             # values and dividing by number of internal sections)
-            use_numba = get_net_option(net, "use_numba")
-            res = _sum_by_group(use_numba, idx_pit, np.ones_like(idx_pit),
-                                comp_connected.astype(np.int32),
-                                *[branch_results[rn[1]][f:t] for rn in res_mean])
-            connected_ind = res[2] > 0.99
-            num_internals = res[1][connected_ind]
-
-            # hint: idx_pit[placement_table] should result in the indices as ordered in the table
-            pt = placement_table[connected_ind]
+            num_internals = num_sections[connected_ind]
 
             for i, (res_name, entry) in enumerate(res_mean_hydraulics):
-                res_table[res_name].values[pt] = res[i + 3][connected_ind] / num_internals
+                summed = np.bincount(group_inverse, weights=branch_results[res_mean[i][1]][f:t],
+                                     minlength=n_groups)
+                res_table[res_name].values[pt] = summed[connected_ind] / num_internals
         if len(res_branch) > 0:
-            use_numba = get_net_option(net, "use_numba")
-            _, sections, connected_sum = _sum_by_group(use_numba, idx_pit, np.ones_like(idx_pit),
-                                comp_connected.astype(np.int32))
-            connected_ind = connected_sum > 0.99
-            indices_last_section = (np.cumsum(sections) - 1).astype(int)[connected_ind]
-            # hint: idx_pit[placement_table] should result in the indices as ordered in the table
-            pt = placement_table[connected_ind]
+            indices_last_section = (np.cumsum(num_sections) - 1).astype(int)[connected_ind]
 
             for i, (res_name, entry) in enumerate(res_branch):
                 res_table[res_name].values[pt] = branch_results[entry][indices_last_section]
@@ -262,21 +273,49 @@ def extract_branch_results_without_internals(net, branch_results, required_resul
     if simulation_mode in ["hydraulics", 'sequential', "bidirectional"]:
         # lookup for connected branch elements (hydraulic results)
         comp_connected_hyd = get_lookup(net, "branch", "active_hydraulics")[f:t]
-        for res_name, entry in required_results_hydraulic:
-            res_table[res_name].values[:][comp_connected_hyd] = \
-                branch_results[entry][f:t][comp_connected_hyd]
-        if simulation_mode == "hydraulics":
-            for res_name, entry in required_results_heat:
-                res_table[res_name].values[:][comp_connected_hyd] = \
-                    branch_results[entry][f:t][comp_connected_hyd]
+        required_results = required_results_hydraulic if simulation_mode != "hydraulics" \
+            else required_results_hydraulic + required_results_heat
+        write_branch_results_to_table(res_table, required_results, branch_results, f, t,
+                                      comp_connected_hyd)
 
     # extract heat transfer results
     if simulation_mode in ["heat", 'sequential', "bidirectional"]:
         # lookup for connected branch elements (heat transfer results)
         comp_connected_ht = get_lookup(net, "branch", "active_heat_transfer")[f:t]
-        for res_name, entry in required_results_heat:
-            res_table[res_name].values[:][comp_connected_ht] = \
-                branch_results[entry][f:t][comp_connected_ht]
+        write_branch_results_to_table(res_table, required_results_heat, branch_results, f, t,
+                                      comp_connected_ht)
+
+
+def write_branch_results_to_table(res_table, required_results, branch_results, f, t,
+                                  comp_connected):
+    """
+    Write a list of branch results into the result table with a single positional assignment.
+
+    Stacking all requested entries into one 2d buffer first avoids a separate fancy-indexed
+    DataFrame write per result column.
+
+    :param res_table: The result table that the results should be written to
+    :type res_table: pandas.DataFrame
+    :param required_results: The entries that should be extracted for the respective component
+    :type required_results: list[tuple]
+    :param branch_results: Important branch results from the internal pit structure
+    :type branch_results: dict[np.ndarray]
+    :param f: Start index of the component entries in the branch pit
+    :type f: int
+    :param t: End index of the component entries in the branch pit
+    :type t: int
+    :param comp_connected: Mask of connected branch elements of the component
+    :type comp_connected: np.ndarray
+    :return: No output
+    :rtype: None
+    """
+    if not len(required_results):
+        return
+    rows = np.flatnonzero(comp_connected)
+    cols = res_table.columns.get_indexer([res_name for res_name, _ in required_results])
+    out = np.column_stack([branch_results[entry][f:t][comp_connected]
+                           for _, entry in required_results])
+    res_table.iloc[rows, cols] = out
 
 
 def extract_results_active_pit(net, mode="hydraulics"):
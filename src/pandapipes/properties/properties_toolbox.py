@@ -149,9 +149,13 @@ def calculate_mass_fraction_from_molar_fraction(component_molar_proportions, com
     return com_array[:, 3]
 
 
-def get_branch_real_density(fluid, node_pit, branch_pit):
-    from_nodes = get_from_nodes_corrected(branch_pit)
-    t_from = node_pit[from_nodes, TINIT]
+def get_branch_real_density(fluid, node_pit, branch_pit, from_nodes=None, t_from=None):
+    # from_nodes and t_from can be handed in by callers that already gathered them, so that the
+    # corrected from nodes and their temperatures are only looked up once per Newton iteration
+    if from_nodes is None:
+        from_nodes = get_from_nodes_corrected(branch_pit)
+    if t_from is None:
+        t_from = node_pit[from_nodes, TINIT]
     t_to = branch_pit[:, TOUTINIT]
     if fluid.is_gas:
         from_p = node_pit[from_nodes, PINIT] + node_pit[from_nodes, PAMB]
@@ -168,17 +172,17 @@ def get_branch_real_density(fluid, node_pit, branch_pit):
     rho = (from_rho + to_rho) / 2
     return rho
 
-def get_branch_real_eta(fluid, node_pit, branch_pit):
-    from_nodes = get_from_nodes_corrected(branch_pit)
-    t_from = node_pit[from_nodes, TINIT]
+def get_branch_real_eta(fluid, node_pit, branch_pit, t_from=None):
+    if t_from is None:
+        t_from = node_pit[get_from_nodes_corrected(branch_pit), TINIT]
     t_to = branch_pit[:, TOUTINIT]
     tm = (t_from + t_to) / 2
     eta = fluid.get_viscosity(tm)
     return eta
 
-def get_branch_cp(fluid, node_pit, branch_pit):
-    from_nodes = get_from_nodes_corrected(branch_pit)
-    t_from = node_pit[from_nodes, TINIT]
+def get_branch_cp(fluid, node_pit, branch_pit, t_from=None):
+    if t_from is None:
+        t_from = node_pit[get_from_nodes_corrected(branch_pit), TINIT]
     t_to = branch_pit[:, TOUTINIT]
     tm = (t_from + t_to) / 2
     cp = fluid.get_heat_capacity(tm)